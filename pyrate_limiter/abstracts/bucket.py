@@ -12,9 +12,11 @@ from threading import Thread
 from typing import Awaitable
 from typing import Dict
 from typing import List
+from typing import MutableMapping
 from typing import Optional
 from typing import Type
 from typing import Union
+from weakref import WeakKeyDictionary
 
 from .clock import AbstractClock
 from .rate import Rate
@@ -115,6 +117,7 @@ class Leaker(Thread):
     sync_buckets: Optional[Dict[int, AbstractBucket]] = None
     async_buckets: Optional[Dict[int, AbstractBucket]] = None
     clocks: Optional[Dict[int, AbstractClock]] = None
+    conditions: Optional[Dict[int, MutableMapping[asyncio.AbstractEventLoop, asyncio.Condition]]] = None
     leak_interval: int = 10_000
     aio_leak_task: Optional[asyncio.Task] = None
 
@@ -122,18 +125,27 @@ class Leaker(Thread):
         self.sync_buckets = defaultdict()
         self.async_buckets = defaultdict()
         self.clocks = defaultdict()
+        self.conditions = defaultdict()
         self.leak_interval = leak_interval
         super().__init__()
 
-    def register(self, bucket: AbstractBucket, clock: AbstractClock):
-        """Register a new bucket with its associated clock"""
+    def register(self, bucket: AbstractBucket, clock: AbstractClock) -> bool:
+        """Register a new bucket with its associated clock
+        Return false if the bucket was already registered
+        """
         assert self.sync_buckets is not None
         assert self.clocks is not None
         assert self.async_buckets is not None
 
-        try_leak = bucket.leak(0)
         bucket_id = id(bucket)
 
+        if bucket_id in self.sync_buckets or bucket_id in self.async_buckets:
+            # NOTE: no need to probe the bucket's backend again
+            self.clocks[bucket_id] = clock
+            return False
+
+        try_leak = bucket.leak(0)
+
         if iscoroutine(try_leak):
             try_leak.close()
             self.async_buckets[bucket_id] = bucket
@@ -141,9 +153,30 @@ class Leaker(Thread):
             self.sync_buckets[bucket_id] = bucket
 
         self.clocks[bucket_id] = clock
+        return True
+
+    def condition(self, bucket_id: int) -> asyncio.Condition:
+        """Get the condition that is notified whenever leaking frees up space in an async bucket
+        NOTE: a condition is bound to the event loop it is used in, so there is one per running loop
+        """
+        assert self.conditions is not None
+        loop = asyncio.get_running_loop()
+
+        if bucket_id not in self.conditions:
+            self.conditions[bucket_id] = WeakKeyDictionary()
+
+        loop_conditions = self.conditions[bucket_id]
+
+        if loop not in loop_conditions:
+            loop_conditions[loop] = asyncio.Condition()
+
+        return loop_conditions[loop]
 
     def deregister(self, bucket_id: int) -> bool:
         """Deregister a bucket"""
+        if self.conditions:
+            self.conditions.pop(bucket_id, None)
+
         if self.sync_buckets and bucket_id in self.sync_buckets:
             del self.sync_buckets[bucket_id]
             assert self.clocks
@@ -165,6 +198,7 @@ class Leaker(Thread):
 
     async def _leak(self, buckets: Dict[int, AbstractBucket]) -> None:
         assert self.clocks
+        assert self.conditions is not None
 
         while buckets:
             for bucket_id, bucket in list(buckets.items()):
@@ -181,6 +215,13 @@ class Leaker(Thread):
                     leak = await leak
 
                 assert isinstance(leak, int)
+                # NOTE: only waiters in the same event loop as this leaking task can be notified
+                loop_conditions = self.conditions.get(bucket_id) if leak > 0 else None
+                condition = loop_conditions.get(asyncio.get_running_loop()) if loop_conditions else None
+
+                if condition is not None:
+                    async with condition:
+                        condition.notify(leak)
 
             await asyncio.sleep(self.leak_interval / 1000)
 
@@ -260,10 +301,22 @@ class BucketFactory(ABC):
         if not self._leaker:
             self._leaker = Leaker(self.leak_interval)
 
-        self._leaker.register(new_bucket, associated_clock)
+        if not self._leaker.register(new_bucket, associated_clock):
+            # NOTE: bucket's leak is already scheduled
+            return
+
         self._leaker.start()
         self._leaker.leak_async()
 
+    def get_condition(self, bucket: AbstractBucket) -> asyncio.Condition:
+        """Get the condition notified by the inner Leaker task
+        whenever it frees up space in an async bucket
+        """
+        if not self._leaker:
+            self._leaker = Leaker(self.leak_interval)
+
+        return self._leaker.condition(id(bucket))
+
     def get_buckets(self) -> List[AbstractBucket]:
         """Iterator over all buckets in the factory
         """
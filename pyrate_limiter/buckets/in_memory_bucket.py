@@ -1,7 +1,10 @@
 """Naive bucket implementation using built-in list
 """
+from typing import cast
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 from ..abstracts import AbstractBucket
 from ..abstracts import Rate
@@ -20,10 +23,12 @@ class InMemoryBucket(AbstractBucket):
 
     items: List[RateItem]
     failing_rate: Optional[Rate]
+    _availability: Dict[Tuple[Rate, int], int]
 
     def __init__(self, rates: List[Rate]):
         self.rates = sorted(rates, key=lambda r: r.interval)
         self.items = []
+        self._availability = {}
 
     def put(self, item: RateItem) -> bool:
         if item.weight == 0:
@@ -51,6 +56,9 @@ class InMemoryBucket(AbstractBucket):
 
         self.failing_rate = None
 
+        if self._availability:
+            self._availability.clear()
+
         if item.weight > 1:
             self.items.extend([item for _ in range(item.weight)])
         else:
@@ -67,6 +75,7 @@ class InMemoryBucket(AbstractBucket):
             if lower_bound > self.items[-1].timestamp:
                 remove_count = len(self.items)
                 self.items = []
+                self._availability.clear()
                 return remove_count
 
             if lower_bound < self.items[0].timestamp:
@@ -74,6 +83,10 @@ class InMemoryBucket(AbstractBucket):
 
             idx = binary_search(self.items, lower_bound)
             self.items = self.items[idx:]
+
+            if idx:
+                self._availability.clear()
+
             return idx
 
         return 0
@@ -81,6 +94,7 @@ class InMemoryBucket(AbstractBucket):
     def flush(self) -> None:
         self.failing_rate = None
         self.items = []
+        self._availability.clear()
 
     def count(self) -> int:
         return len(self.items)
@@ -90,3 +104,24 @@ class InMemoryBucket(AbstractBucket):
             return None
 
         return self.items[-1 - index] if abs(index) < self.count() else None
+
+    def waiting(self, item: RateItem) -> int:
+        """The timestamp at which the bucket can fit an item only depends on
+        the failing rate & the item's weight, so it is kept until the bucket's items change
+        """
+        if self.failing_rate is None:
+            return 0
+
+        key = (self.failing_rate, item.weight)
+        available_at = self._availability.get(key)
+
+        if available_at is None:
+            # NOTE: the bucket is sync, so is the base `waiting`
+            wait = cast(int, super().waiting(item))
+
+            if wait <= 0:
+                return wait
+
+            available_at = self._availability[key] = item.timestamp + wait
+
+        return available_at - item.timestamp
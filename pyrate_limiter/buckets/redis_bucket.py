@@ -2,10 +2,13 @@
 """
 from __future__ import annotations
 
+import asyncio
 from inspect import isawaitable
+from typing import Any
 from typing import Awaitable
 from typing import List
 from typing import Optional
+from typing import Set
 from typing import Tuple
 from typing import TYPE_CHECKING
 from typing import Union
@@ -55,6 +58,7 @@ class RedisBucket(AbstractBucket):
     - In distributed context, use local server time or a remote time server
     - Each bucket instance use a dedicated connection to avoid race-condition
     - can be either sync or async
+    - with async redis, concurrent puts are batched into a single pipeline
     """
 
     rates: List[Rate]
@@ -62,6 +66,10 @@ class RedisBucket(AbstractBucket):
     bucket_key: str
     script_hash: str
     redis: Union[Redis, AsyncRedis]
+    batch_size: int = 100
+    _is_async: Optional[bool]
+    _pending_puts: List[Tuple[List[Any], asyncio.Future]]
+    _batch_tasks: Set[asyncio.Task]
 
     def __init__(
         self,
@@ -75,6 +83,9 @@ class RedisBucket(AbstractBucket):
         self.bucket_key = bucket_key
         self.script_hash = script_hash
         self.failing_rate = None
+        self._is_async = None
+        self._pending_puts = []
+        self._batch_tasks = set()
 
     @classmethod
     def init(
@@ -108,21 +119,82 @@ class RedisBucket(AbstractBucket):
             *[value for rate in self.rates for value in (rate.interval, rate.limit)],
         ]
 
-        idx = self.redis.evalsha(self.script_hash, len(keys), *keys, *args)
+        # NOTE: either the script's result or an awaitable of it, depending on the redis client
+        idx: Any
 
-        def _handle_sync(returned_idx: int):
+        if self._is_async is None:
+            idx = self.redis.evalsha(self.script_hash, len(keys), *keys, *args)
+            self._is_async = isawaitable(idx)
+        elif self._is_async:
+            idx = self._batch_evalsha(args)
+        else:
+            idx = self.redis.evalsha(self.script_hash, len(keys), *keys, *args)
+
+        def _handle_sync(returned_idx: int) -> Optional[Rate]:
             assert isinstance(returned_idx, int), "Not int"
             if returned_idx < 0:
                 return None
 
             return self.rates[returned_idx]
 
-        async def _handle_async(returned_idx: Awaitable[int]):
+        async def _handle_async(returned_idx: Awaitable[int]) -> Optional[Rate]:
             assert isawaitable(returned_idx), "Not corotine"
             awaited_idx = await returned_idx
             return _handle_sync(awaited_idx)
 
-        return _handle_async(idx) if isawaitable(idx) else _handle_sync(idx)
+        if self._is_async:
+            return _handle_async(idx)
+
+        return _handle_sync(idx)
+
+    async def _batch_evalsha(self, args: List[Any]) -> int:
+        """Queue the put-script call into the next pipeline,
+        which is sent once all puts ready in the current loop iteration got queued
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_puts.append((args, future))
+
+        if len(self._pending_puts) == 1:
+            loop.call_soon(self._flush_pending_puts)
+        elif len(self._pending_puts) >= self.batch_size:
+            self._flush_pending_puts()
+
+        return await future
+
+    def _flush_pending_puts(self) -> None:
+        if not self._pending_puts:
+            return
+
+        batch, self._pending_puts = self._pending_puts, []
+        # NOTE: the event loop only keeps weak references to tasks
+        task = asyncio.ensure_future(self._execute_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _execute_batch(self, batch: List[Tuple[List[Any], asyncio.Future]]) -> None:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:  # type: ignore
+                for args, _ in batch:
+                    pipe.evalsha(self.script_hash, 1, self.bucket_key, *args)
+
+                # NOTE: a failing script call must only fail its own put
+                results = await pipe.execute(raise_on_error=False)  # type: ignore
+        except Exception as err:  # pylint: disable=broad-except
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
 
     def put(self, item: RateItem) -> Union[bool, Awaitable[bool]]:
         """Add item to key"""
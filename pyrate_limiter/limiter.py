@@ -2,6 +2,7 @@
 """
 import asyncio
 import logging
+import random
 from functools import wraps
 from inspect import isawaitable
 from threading import RLock
@@ -9,6 +10,8 @@ from time import sleep
 from typing import Any
 from typing import Awaitable
 from typing import Callable
+from typing import cast
+from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Tuple
@@ -30,6 +33,40 @@ logger = logging.getLogger("pyrate_limiter")
 ItemMapping = Callable[[Any], Tuple[str, int]]
 DecoratorWrapper = Callable[[Callable[[Any], Any]], Callable[[Any], Any]]
 
+# NOTE: how many times a delayed item is put into the bucket again before giving up,
+# and the max random jitter (as a ratio of the delay) added to each delay
+REACQUIRE_ATTEMPTS = 3
+DELAY_JITTER = 0.05
+
+# NOTE: delays are kept in integer ms, only converted to seconds when sleeping
+_MS_TO_S = 0.001
+
+
+def _add_jitter(delay: int, budget: int) -> int:
+    """Spread out waiters expecting the same delay, without exceeding the remaining budget"""
+    jitter = min(delay * DELAY_JITTER, budget - delay)
+    return delay + int(random.uniform(0, jitter)) if jitter > 0 else delay
+
+
+async def _wrap_item_async(name: str, now: Awaitable[int], weight: int) -> RateItem:
+    return RateItem(name, await now, weight=weight)
+
+
+async def _call_after_acquire(
+    acquire: Awaitable[bool],
+    func: Callable[..., Any],
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+) -> Any:
+    await acquire
+    result = func(*args, **kwargs)
+
+    if isawaitable(result):
+        # NOTE: plain function returning an awaitable, ie: wrapped by another decorator
+        return await result
+
+    return result
+
 
 class SingleBucketFactory(BucketFactory):
     """Single-bucket factory for quick use with Limiter"""
@@ -42,16 +79,13 @@ class SingleBucketFactory(BucketFactory):
         self.bucket = bucket
         self.schedule_leak(bucket, clock)
 
-    def wrap_item(self, name: str, weight: int = 1):
+    def wrap_item(self, name: str, weight: int = 1) -> Union[RateItem, Awaitable[RateItem]]:
         now = self.clock.now()
 
-        async def wrap_async():
-            return RateItem(name, await now, weight=weight)
-
-        def wrap_sync():
-            return RateItem(name, now, weight=weight)
+        if isawaitable(now):
+            return _wrap_item_async(name, now, weight)
 
-        return wrap_async() if isawaitable(now) else wrap_sync()
+        return RateItem(name, now, weight=weight)  # type: ignore[arg-type]
 
     def get(self, _: RateItem) -> AbstractBucket:
         return self.bucket
@@ -62,10 +96,32 @@ class Limiter:
     and make working with async/sync functions easily
     """
 
+    __slots__ = (
+        "bucket_factory",
+        "raise_when_fail",
+        "max_delay",
+        "latency_tolerance",
+        "lock",
+        "_max_wait",
+        "_wrap_is_async",
+        "_bucket_put_is_async",
+        "_wrap_item",
+        "_get_bucket",
+        "_single_bucket",
+        "__weakref__",
+    )
+
     bucket_factory: BucketFactory
     raise_when_fail: bool
-    max_delay: Optional[int] = None
+    max_delay: Optional[int]
+    latency_tolerance: int
     lock: RLock
+    _max_wait: Optional[int]
+    _wrap_is_async: Optional[bool]
+    _bucket_put_is_async: Dict[int, Tuple[type, bool]]
+    _wrap_item: Callable[[str, int], Union[RateItem, Awaitable[RateItem]]]
+    _get_bucket: Callable[[RateItem], Union[AbstractBucket, Awaitable[AbstractBucket]]]
+    _single_bucket: Optional[AbstractBucket]
 
     def __init__(
         self,
@@ -73,11 +129,21 @@ class Limiter:
         clock: AbstractClock = TimeClock(),
         raise_when_fail: bool = True,
         max_delay: Optional[Union[int, Duration]] = None,
+        latency_tolerance: int = 50,
     ):
         """Init Limiter using either a single bucket / multiple-bucket factory
         / single rate / rate list
+        - latency_tolerance: extra time (in ms) added to every delay
         """
         self.bucket_factory = self._init_bucket_factory(argument, clock=clock)
+        self._wrap_item = self.bucket_factory.wrap_item
+        self._get_bucket = self.bucket_factory.get
+        # NOTE: with a single-bucket factory, the bucket lookup can be skipped entirely
+        self._single_bucket = None
+
+        if isinstance(self.bucket_factory, SingleBucketFactory):
+            self._single_bucket = self.bucket_factory.bucket
+
         self.raise_when_fail = raise_when_fail
 
         if max_delay is not None:
@@ -86,8 +152,18 @@ class Limiter:
 
             assert max_delay >= 0, "Max-delay must not be negative"
 
+        assert latency_tolerance >= 0, "Latency-tolerance must not be negative"
         self.max_delay = max_delay
+        self.latency_tolerance = latency_tolerance
+        # NOTE: the longest bucket waiting that still fits in max-delay once the tolerance is added
+        self._max_wait = None if max_delay is None else max_delay - latency_tolerance
         self.lock = RLock()
+        # NOTE: a factory/bucket is either sync or async for its whole lifetime,
+        # so it is inspected once on first use then cached.
+        # Buckets are keyed by id, which can be reused once a bucket is dropped by its factory,
+        # so the bucket's type is kept along with its flag to tell a different kind of bucket apart
+        self._wrap_is_async = None
+        self._bucket_put_is_async = {}
 
     def buckets(self) -> List[AbstractBucket]:
         """Get list of active buckets
@@ -98,6 +174,8 @@ class Limiter:
         """Dispose/Remove a specific bucket,
         using bucket-id or bucket object as param
         """
+        bucket_id = id(bucket) if isinstance(bucket, AbstractBucket) else bucket
+        self._bucket_put_is_async.pop(bucket_id, None)
         return self.bucket_factory.dispose(bucket)
 
     def _init_bucket_factory(
@@ -126,7 +204,7 @@ class Limiter:
         self,
         bucket: AbstractBucket,
         item: RateItem,
-    ):
+    ) -> None:
         if self.raise_when_fail:
             assert bucket.failing_rate is not None  # NOTE: silence mypy
             raise BucketFullException(item, bucket.failing_rate)
@@ -136,7 +214,7 @@ class Limiter:
         bucket: AbstractBucket,
         item: RateItem,
         delay: int,
-    ):
+    ) -> None:
         if self.raise_when_fail:
             assert bucket.failing_rate is not None  # NOTE: silence mypy
             assert isinstance(self.max_delay, int)
@@ -147,61 +225,103 @@ class Limiter:
                 self.max_delay,
             )
 
-    def delay_or_raise(
-        self,
-        bucket: AbstractBucket,
-        item: RateItem,
-    ) -> Union[bool, Awaitable[bool]]:
-        """On `try_acquire` failed, handle delay or raise error immediately"""
-        assert bucket.failing_rate is not None
+    def _handle_reacquire(self, bucket: AbstractBucket, item: RateItem, re_acquire: bool) -> bool:
+        if not re_acquire:
+            logger.error(
+                """
+            Re-acquiring with delay expected to be successful,
+            if it failed then either clock or bucket is probably unstable
+            """
+            )
+            self._raise_bucket_full_if_necessary(bucket, item)
 
-        if self.max_delay is None:
+        return re_acquire
+
+    def _delay_or_raise_sync(self, bucket: AbstractBucket, item: RateItem, waiting: Optional[int] = None) -> bool:
+        max_wait = self._max_wait
+
+        if max_wait is None:
+            self._raise_bucket_full_if_necessary(bucket, item)
+            return False
+
+        # NOTE: the bucket is sync, so is `bucket.waiting`
+        delay = cast(int, bucket.waiting(item)) if waiting is None else waiting
+
+        if delay < 0:
+            logger.error(
+                "Cannot fit item into bucket: item=%s, rate=%s, bucket=%s",
+                item,
+                bucket.failing_rate,
+                bucket,
+            )
             self._raise_bucket_full_if_necessary(bucket, item)
             return False
 
-        delay = bucket.waiting(item)
+        if delay > max_wait:
+            delay += self.latency_tolerance
+            logger.error(
+                "Required delay too large: actual=%s, expected=%s",
+                delay,
+                self.max_delay,
+            )
+            self._raise_delay_exception_if_necessary(bucket, item, delay)
+            return False
+
+        max_delay = max_wait + self.latency_tolerance
+        delay += self.latency_tolerance
+        spent = 0
+
+        for _ in range(REACQUIRE_ATTEMPTS):
+            delay = _add_jitter(delay, max_delay - spent)
+            sleep(delay * _MS_TO_S)
+            spent += delay
+            item.timestamp += delay
+
+            # NOTE: the bucket is sync, so is `bucket.put`
+            if bucket.put(item):
+                return True
+
+            delay = cast(int, bucket.waiting(item))
 
-        def _handle_reacquire(re_acquire: bool) -> bool:
-            if not re_acquire:
+            if delay < 0:
+                break
+
+            if spent + delay > max_wait:
+                delay += spent + self.latency_tolerance
                 logger.error(
-                    """
-                Re-acquiring with delay expected to be successful,
-                if it failed then either clock or bucket is probably unstable
-                """
+                    "Required delay too large: actual=%s, expected=%s",
+                    delay,
+                    self.max_delay,
                 )
-                self._raise_bucket_full_if_necessary(bucket, item)
+                self._raise_delay_exception_if_necessary(bucket, item, delay)
+                return False
 
-            return re_acquire
+            delay += self.latency_tolerance
 
-        if isawaitable(delay):
+        return self._handle_reacquire(bucket, item, False)
 
-            async def _handle_async():
-                nonlocal delay
-                delay = await delay
-                assert isinstance(delay, int), "Delay not integer"
-                delay += 50
+    async def _waiting_async(self, bucket: AbstractBucket, item: RateItem) -> int:
+        waiting = bucket.waiting(item)
 
-                if delay > self.max_delay:
-                    logger.error(
-                        "Required delay too large: actual=%s, expected=%s",
-                        delay,
-                        self.max_delay,
-                    )
-                    self._raise_delay_exception_if_necessary(bucket, item, delay)
-                    return False
+        if isawaitable(waiting):
+            # NOTE: `waiting` can short-circuit with a plain integer even for async buckets
+            waiting = await waiting
 
-                await asyncio.sleep(delay / 1000)
-                item.timestamp += delay
-                re_acquire = bucket.put(item)
+        return cast(int, waiting)
 
-                if isawaitable(re_acquire):
-                    re_acquire = await re_acquire
-
-                return _handle_reacquire(re_acquire)
+    async def _delay_or_raise_async(
+        self,
+        bucket: AbstractBucket,
+        item: RateItem,
+        waiting: Optional[Awaitable[int]] = None,
+    ) -> bool:
+        max_wait = self._max_wait
 
-            return _handle_async()
+        if max_wait is None:
+            self._raise_bucket_full_if_necessary(bucket, item)
+            return False
 
-        assert isinstance(delay, int)
+        delay = await self._waiting_async(bucket, item) if waiting is None else await waiting
 
         if delay < 0:
             logger.error(
@@ -213,9 +333,8 @@ class Limiter:
             self._raise_bucket_full_if_necessary(bucket, item)
             return False
 
-        delay += 50
-
-        if delay > self.max_delay:
+        if delay > max_wait:
+            delay += self.latency_tolerance
             logger.error(
                 "Required delay too large: actual=%s, expected=%s",
                 delay,
@@ -224,43 +343,170 @@ class Limiter:
             self._raise_delay_exception_if_necessary(bucket, item, delay)
             return False
 
-        sleep(delay / 1000)
-        item.timestamp += delay
-        re_acquire = bucket.put(item)
-        # NOTE: if delay is not Awaitable, then `bucket.put` is not Awaitable
-        assert isinstance(re_acquire, bool)
-        return _handle_reacquire(re_acquire)
+        max_delay = max_wait + self.latency_tolerance
+        delay += self.latency_tolerance
+        spent = 0
 
-    def handle_bucket_put(
+        for _ in range(REACQUIRE_ATTEMPTS):
+            delay = _add_jitter(delay, max_delay - spent)
+            spent += delay
+
+            if await self._wait_and_reacquire(bucket, item, delay):
+                return True
+
+            delay = await self._waiting_async(bucket, item)
+
+            if delay < 0:
+                break
+
+            if spent + delay > max_wait:
+                delay += spent + self.latency_tolerance
+                logger.error(
+                    "Required delay too large: actual=%s, expected=%s",
+                    delay,
+                    self.max_delay,
+                )
+                self._raise_delay_exception_if_necessary(bucket, item, delay)
+                return False
+
+            delay += self.latency_tolerance
+
+        return self._handle_reacquire(bucket, item, False)
+
+    def delay_or_raise(
         self,
         bucket: AbstractBucket,
         item: RateItem,
     ) -> Union[bool, Awaitable[bool]]:
-        """Putting item into bucket"""
+        """On `try_acquire` failed, handle delay or raise error immediately
+        NOTE: the bucket's failing-rate is set by the failed `put`,
+        it is only read when raising
+        """
+        bucket_type = type(bucket)
+        cached = self._bucket_put_is_async.get(id(bucket))
 
-        def _handle_result(is_success: bool):
-            if not is_success:
-                return self.delay_or_raise(bucket, item)
+        if cached is not None and cached[0] is bucket_type:
+            if cached[1]:
+                return self._delay_or_raise_async(bucket, item)
 
+            return self._delay_or_raise_sync(bucket, item)
+
+        if self._max_wait is None:
+            self._raise_bucket_full_if_necessary(bucket, item)
+            return False
+
+        # NOTE: a bucket not seen yet, whose waiting tells whether it is async
+        waiting = bucket.waiting(item)
+        is_async = isawaitable(waiting)
+        self._bucket_put_is_async[id(bucket)] = (bucket_type, is_async)
+
+        if is_async:
+            return self._delay_or_raise_async(bucket, item, cast(Awaitable[int], waiting))
+
+        return self._delay_or_raise_sync(bucket, item, cast(int, waiting))
+
+    async def _wait_and_reacquire(
+        self,
+        bucket: AbstractBucket,
+        item: RateItem,
+        delay: int,
+    ) -> bool:
+        """Wait up to `delay` before putting the item into an async bucket again.
+        Waiters of the same bucket share a condition that gets notified when
+        leaking frees up space, only as many waiters as the freed items are woken up
+        to retry the bucket before their expected delay
+        """
+        condition = self.bucket_factory.get_condition(bucket)
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        deadline = started_at + delay * _MS_TO_S
+        timestamp = item.timestamp
+
+        while True:
+            remaining = deadline - loop.time()
+
+            if remaining <= 0:
+                break
+
+            async with condition:
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            # NOTE: woken up by the leaker, the bucket might have space before the expected delay,
+            # the lock is already released so that re-puts of other waiters are not serialized
+            item.timestamp = timestamp + int(1000 * (loop.time() - started_at))
+
+            # NOTE: the bucket is async, so is `bucket.put`
+            if await cast(Awaitable[bool], bucket.put(item)):
+                return True
+
+        item.timestamp = timestamp + delay
+        return await cast(Awaitable[bool], bucket.put(item))
+
+    async def _handle_put_async(
+        self,
+        bucket: AbstractBucket,
+        item: RateItem,
+        acquire: Awaitable[bool],
+    ) -> bool:
+        if await acquire:
             return True
 
+        return await self._delay_or_raise_async(bucket, item)
+
+    def _put_item(self, bucket: AbstractBucket, item: RateItem) -> Union[bool, Awaitable[bool]]:
         acquire = bucket.put(item)
+        bucket_type = type(bucket)
+        cached = self._bucket_put_is_async.get(id(bucket))
+
+        if cached is None or cached[0] is not bucket_type:
+            is_async = isawaitable(acquire)
+            self._bucket_put_is_async[id(bucket)] = (bucket_type, is_async)
+        else:
+            is_async = cached[1]
+
+        if is_async:
+            return self._handle_put_async(bucket, item, acquire)  # type: ignore[arg-type]
+
+        if acquire:
+            return True
+
+        return self._delay_or_raise_sync(bucket, item)
+
+    def handle_bucket_put(
+        self,
+        bucket: AbstractBucket,
+        item: RateItem,
+    ) -> Union[bool, Awaitable[bool]]:
+        """Putting item into bucket"""
+        return self._put_item(bucket, item)
+
+    async def _handle_bucket_async(self, bucket: Awaitable[AbstractBucket], item: RateItem) -> bool:
+        acquire = self._put_item(await bucket, item)
 
         if isawaitable(acquire):
+            return await acquire
+
+        return acquire  # type: ignore[return-value]
+
+    async def _try_acquire_async(self, item: Awaitable[RateItem]) -> bool:
+        awaited_item = await item
+        bucket: Any = self._single_bucket
 
-            async def _put_async():
-                nonlocal acquire
-                acquire = await acquire
-                result = _handle_result(acquire)
+        if bucket is None:
+            bucket = self._get_bucket(awaited_item)
 
-                while isawaitable(result):
-                    result = await result
+            if isawaitable(bucket):
+                bucket = await bucket
 
-                return result
+        acquire = self._put_item(bucket, awaited_item)
 
-            return _put_async()
+        if isawaitable(acquire):
+            return await acquire
 
-        return _handle_result(acquire)  # type: ignore
+        return acquire  # type: ignore[return-value]
 
     def try_acquire(self, name: str, weight: int = 1) -> Union[bool, Awaitable[bool]]:
         """Try acquiring an item with name & weight
@@ -274,89 +520,68 @@ class Limiter:
                 # NOTE: this might change in the future
                 return True
 
-            item = self.bucket_factory.wrap_item(name, weight)
-
-            if isawaitable(item):
-
-                async def _handle_async():
-                    nonlocal item
-                    item = await item
-                    bucket = self.bucket_factory.get(item)
-                    if isawaitable(bucket):
-                        bucket = await bucket
-                    assert isinstance(bucket, AbstractBucket), f"Invalid bucket: item: {name}"
-                    result = self.handle_bucket_put(bucket, item)
+            # NOTE: `Any`-typed locals instead of casts, which are actual calls on this hot path
+            item: Any = self._wrap_item(name, weight)
+            wrap_is_async = self._wrap_is_async
 
-                    while isawaitable(result):
-                        result = await result
+            if wrap_is_async is None:
+                wrap_is_async = self._wrap_is_async = isawaitable(item)
 
-                    return result
+            if wrap_is_async:
+                return self._try_acquire_async(item)
 
-                return _handle_async()
+            bucket: Any = self._single_bucket
 
-            assert isinstance(item, RateItem)  # NOTE: this is to silence mypy warning
-            bucket = self.bucket_factory.get(item)
-            if isawaitable(bucket):
+            if bucket is None:
+                bucket = self._get_bucket(item)
 
-                async def _handle_async_bucket():
-                    nonlocal bucket
-                    bucket = await bucket
-                    assert isinstance(bucket, AbstractBucket), f"Invalid bucket: item: {name}"
-                    result = self.handle_bucket_put(bucket, item)
+                if isawaitable(bucket):
+                    return self._handle_bucket_async(bucket, item)
 
-                    while isawaitable(result):
-                        result = await result
+            return self._put_item(bucket, item)
 
-                    return result
+    def as_decorator(self) -> Callable[[ItemMapping], DecoratorWrapper]:
+        """Use limiter decorator
+        Use with both sync & async function
+        """
 
-                return _handle_async_bucket()
+        def with_mapping_func(mapping: ItemMapping) -> DecoratorWrapper:
+            try_acquire = self.try_acquire
 
-            assert isinstance(bucket, AbstractBucket), f"Invalid bucket: item: {name}"
-            result = self.handle_bucket_put(bucket, item)
+            def decorator_wrapper(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+                """Actual function warpper"""
 
-            if isawaitable(result):
+                if asyncio.iscoroutinefunction(func):
 
-                async def _handle_async_result():
-                    nonlocal result
-                    while isawaitable(result):
-                        result = await result
+                    @wraps(func)
+                    async def wrapper_async(*args, **kwargs):
+                        (name, weight) = mapping(*args, **kwargs)
 
-                    return result
+                        if type(name) is not str or type(weight) is not int:
+                            raise TypeError(f"Mapping must return a (str, int) pair, got: ({name!r}, {weight!r})")
 
-                return _handle_async_result()
+                        accquire_ok = try_acquire(name, weight)
 
-            return result
+                        if isawaitable(accquire_ok):
+                            await accquire_ok
 
-    def as_decorator(self) -> Callable[[ItemMapping], DecoratorWrapper]:
-        """Use limiter decorator
-        Use with both sync & async function
-        """
+                        return await func(*args, **kwargs)
 
-        def with_mapping_func(mapping: ItemMapping) -> DecoratorWrapper:
-            def decorator_wrapper(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
-                """Actual function warpper"""
+                    return wrapper_async
 
                 @wraps(func)
                 def wrapper(*args, **kwargs):
                     (name, weight) = mapping(*args, **kwargs)
-                    assert isinstance(name, str), "Mapping name is expected but not found"
-                    assert isinstance(weight, int), "Mapping weight is expected but not found"
-                    accquire_ok = self.try_acquire(name, weight)
-
-                    if not isawaitable(accquire_ok):
-                        return func(*args, **kwargs)
 
-                    async def _handle_accquire_async():
-                        nonlocal accquire_ok
-                        accquire_ok = await accquire_ok
-                        result = func(*args, **kwargs)
+                    if type(name) is not str or type(weight) is not int:
+                        raise TypeError(f"Mapping must return a (str, int) pair, got: ({name!r}, {weight!r})")
 
-                        if isawaitable(result):
-                            return await result
+                    accquire_ok = try_acquire(name, weight)
 
-                        return result
+                    if not isawaitable(accquire_ok):
+                        return func(*args, **kwargs)
 
-                    return _handle_accquire_async()
+                    return _call_after_acquire(accquire_ok, func, args, kwargs)
 
                 return wrapper
 
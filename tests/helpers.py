@@ -9,7 +9,9 @@ from typing import Tuple
 
 from .conftest import logger
 from pyrate_limiter import AbstractBucket
+from pyrate_limiter import InMemoryBucket
 from pyrate_limiter import Limiter
+from pyrate_limiter import Rate
 from pyrate_limiter import RateItem
 
 
@@ -101,3 +103,37 @@ async def flushing_bucket(bucket: AbstractBucket):
 
     if isawaitable(flush):
         await flush
+
+
+class FlakyBucket(InMemoryBucket):
+    """In-memory bucket whose first `failures` puts fail regardless of its items,
+    and whose waiting is fixed
+    """
+
+    def __init__(self, rates: List[Rate], failures: int, waiting: int = 0):
+        super().__init__(rates)
+        self.failures = failures
+        self.fixed_waiting = waiting
+        self.put_count = 0
+
+    def put(self, item: RateItem) -> bool:
+        self.put_count += 1
+
+        if self.put_count <= self.failures:
+            self.failing_rate = self.rates[0]
+            return False
+
+        return super().put(item)
+
+    def waiting(self, item: RateItem) -> int:
+        return self.fixed_waiting
+
+
+class AsyncFlakyBucket(FlakyBucket):
+    """Async version of FlakyBucket"""
+
+    async def put(self, item: RateItem) -> bool:  # type: ignore
+        return super().put(item)
+
+    async def waiting(self, item: RateItem) -> int:  # type: ignore
+        return super().waiting(item)
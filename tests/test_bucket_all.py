@@ -1,16 +1,20 @@
 """
 Testing buckets of all implementations
 """
+import asyncio
 from inspect import isawaitable
 from time import sleep
 from time import time
 
 import pytest
+from redis.exceptions import ResponseError
 
 from .conftest import ClockSet
+from .conftest import create_async_redis_bucket
 from .conftest import logger
 from pyrate_limiter import AbstractClock
 from pyrate_limiter import BucketAsyncWrapper
+from pyrate_limiter import InMemoryBucket
 from pyrate_limiter import Rate
 from pyrate_limiter import RateItem
 from pyrate_limiter import TimeClock
@@ -231,6 +235,100 @@ async def test_bucket_flush(create_bucket):
     assert bucket.failing_rate is None
 
 
+def test_in_memory_bucket_waiting_cache():
+    """InMemoryBucket's cached availability is dropped whenever its items change"""
+    rates = [Rate(2, 1000)]
+    bucket = InMemoryBucket(rates)
+
+    def fill_and_wait():
+        assert bucket.put(RateItem("item", 0))
+        assert bucket.put(RateItem("item", 0))
+        assert not bucket.put(RateItem("item", 100))
+        assert bucket.waiting(RateItem("item", 100)) == 900
+        assert bucket.waiting(RateItem("item", 400)) == 600
+        assert bucket._availability
+
+    fill_and_wait()
+    # NOTE: leaking nothing keeps the cache
+    assert bucket.leak(500) == 0
+    assert bucket._availability
+    assert bucket.put(RateItem("item", 1001))
+    assert not bucket._availability
+
+    bucket.flush()
+    fill_and_wait()
+    assert bucket.leak(1001) == 2
+    assert not bucket._availability
+
+    bucket.flush()
+    fill_and_wait()
+    bucket.flush()
+    assert not bucket._availability
+    assert bucket.waiting(RateItem("item", 100)) == 0
+
+
+@pytest.mark.asyncio
+async def test_bucket_concurrent_put(create_bucket):
+    """Putting items concurrently, ie: async redis bucket batching them into a pipeline"""
+    clock = TimeClock()
+    rates = [Rate(20, 1000)]
+    bucket = BucketAsyncWrapper(await create_bucket(rates))
+    now = await get_now(clock)
+
+    results = await asyncio.gather(*[bucket.put(RateItem("item", now)) for _ in range(30)])
+    assert results == [True] * 20 + [False] * 10
+    assert await bucket.count() == 20
+    assert bucket.failing_rate == rates[0]
+
+
+@pytest.mark.asyncio
+async def test_async_redis_bucket_batching():
+    """Concurrent puts into an async redis bucket are sent in pipelines of `batch_size`,
+    a failing script call only fails its own put
+    """
+    clock = TimeClock()
+    rates = [Rate(20, 1000)]
+    bucket = await create_async_redis_bucket(rates)
+    pipeline = bucket.redis.pipeline
+    pipelines = []
+
+    def spy_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        pipelines.append(pipe)
+        return pipe
+
+    bucket.redis.pipeline = spy_pipeline
+    now = await get_now(clock)
+
+    # NOTE: the first put detects the redis client being async
+    assert await bucket.put(RateItem("item", now)) is True
+    assert not pipelines
+
+    results = await asyncio.gather(*[bucket.put(RateItem("item", now)) for _ in range(29)])
+    assert results == [True] * 19 + [False] * 10
+    assert len(pipelines) == 1
+
+    await bucket.flush()
+    bucket.batch_size = 10
+    results = await asyncio.gather(*[bucket.put(RateItem("item", now)) for _ in range(30)])
+    assert results == [True] * 20 + [False] * 10
+    assert len(pipelines) == 4
+
+    await bucket.flush()
+    # NOTE: a non-numeric timestamp makes the script fail
+    results = await asyncio.gather(
+        bucket.put(RateItem("item", now)),
+        bucket.put(RateItem("item", "not-a-timestamp")),  # type: ignore
+        bucket.put(RateItem("item", now)),
+        return_exceptions=True,
+    )
+    assert results[0] is True
+    assert isinstance(results[1], ResponseError)
+    assert results[2] is True
+    assert len(pipelines) == 5
+    assert await bucket.count() == 2
+
+
 @pytest.mark.asyncio
 async def test_bucket_performance(create_bucket):
     """Bucket's performance test
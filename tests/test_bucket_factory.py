@@ -11,6 +11,7 @@ from .conftest import logger
 from .demo_bucket_factory import DemoBucketFactory
 from .helpers import async_count
 from pyrate_limiter import AbstractBucket
+from pyrate_limiter import InMemoryBucket
 from pyrate_limiter import RateItem
 
 
@@ -34,6 +35,20 @@ async def test_factory_01(clock, create_bucket):
     assert isinstance(bucket, AbstractBucket)
 
 
+@pytest.mark.asyncio
+async def test_factory_schedule_leak_once(clock):
+    bucket = InMemoryBucket(DEFAULT_RATES)
+    factory = DemoBucketFactory(clock, auto_leak=True, demo=bucket)
+
+    logger.info("Scheduling an already scheduled bucket is a no-op")
+    assert factory._leaker.register(bucket, clock) is False
+    factory.schedule_leak(bucket, clock)
+    assert factory.get_buckets() == [bucket]
+
+    assert factory.dispose(bucket)
+    assert factory.get_buckets() == []
+
+
 @pytest.mark.asyncio
 async def test_factory_leak(clock, create_bucket):
     bucket1 = await create_bucket(DEFAULT_RATES)
@@ -1,6 +1,9 @@
 """Complete Limiter test suite
 """
+import asyncio
+import weakref
 from inspect import isawaitable
+from time import time
 
 import pytest
 
@@ -9,7 +12,9 @@ from .conftest import logger
 from .demo_bucket_factory import DemoAsyncGetBucketFactory
 from .demo_bucket_factory import DemoBucketFactory
 from .helpers import async_acquire
+from .helpers import AsyncFlakyBucket
 from .helpers import concurrent_acquire
+from .helpers import FlakyBucket
 from .helpers import flushing_bucket
 from .helpers import inspect_bucket_items
 from .helpers import prefilling_bucket
@@ -21,6 +26,9 @@ from pyrate_limiter import Duration
 from pyrate_limiter import InMemoryBucket
 from pyrate_limiter import Limiter
 from pyrate_limiter import LimiterDelayException
+from pyrate_limiter import Rate
+from pyrate_limiter import RateItem
+from pyrate_limiter import REACQUIRE_ATTEMPTS
 from pyrate_limiter import SingleBucketFactory
 from pyrate_limiter import TimeClock
 
@@ -40,6 +48,11 @@ async def test_limiter_constructor_01(clock):
     assert limiter.bucket_factory.clock == clock
 
     assert len(limiter.buckets()) == 1
+    assert limiter.latency_tolerance == 50
+
+    limiter = Limiter(DEFAULT_RATES, clock=clock, max_delay=500, latency_tolerance=10)
+    assert limiter.latency_tolerance == 10
+    assert weakref.ref(limiter)() is limiter
 
 
 @pytest.mark.asyncio
@@ -298,6 +311,172 @@ async def test_limiter_concurrency(
             logger.info("(Raise, delay) Result = %s, Item = %s", result, item_names)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bucket_class", [FlakyBucket, AsyncFlakyBucket])
+async def test_limiter_delay_retry(bucket_class):
+    """A delayed item failing to be put again is retried after another delay"""
+    # NOTE: the initial put & the first re-put fail
+    bucket = bucket_class(DEFAULT_RATES, failures=2)
+    limiter = Limiter(bucket, clock=TimeClock(), max_delay=Duration.SECOND)
+
+    acquire_ok, cost = await async_acquire(limiter, "demo")
+    assert acquire_ok
+    assert bucket.put_count == 3
+    # NOTE: the bucket has no waiting, so each delay is just the latency-tolerance
+    assert 90 < cost < 500
+
+    limiter.dispose(bucket)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bucket_class", [FlakyBucket, AsyncFlakyBucket])
+async def test_limiter_delay_retry_attempts(bucket_class, limiter_should_raise):
+    """Re-putting a delayed item stops after REACQUIRE_ATTEMPTS"""
+    bucket = bucket_class(DEFAULT_RATES, failures=100)
+    limiter = Limiter(bucket, clock=TimeClock(), raise_when_fail=limiter_should_raise, max_delay=Duration.SECOND)
+
+    if limiter_should_raise:
+        with pytest.raises(BucketFullException):
+            await async_acquire(limiter, "demo")
+    else:
+        acquire_ok, _ = await async_acquire(limiter, "demo")
+        assert not acquire_ok
+
+    assert bucket.put_count == 1 + REACQUIRE_ATTEMPTS
+    limiter.dispose(bucket)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("bucket_class", [FlakyBucket, AsyncFlakyBucket])
+async def test_limiter_delay_retry_budget(bucket_class, limiter_should_raise):
+    """Retries, including their jitter, never wait longer than max-delay in total"""
+    bucket = bucket_class(DEFAULT_RATES, failures=100, waiting=200)
+    limiter = Limiter(bucket, clock=TimeClock(), raise_when_fail=limiter_should_raise, max_delay=600)
+    start = time()
+
+    if limiter_should_raise:
+        with pytest.raises(LimiterDelayException) as exc:
+            await async_acquire(limiter, "demo")
+
+        # NOTE: the delay reported is the total delay required, beyond the 600ms budget
+        assert exc.value.meta_info["actual_delay"] > 600
+    else:
+        acquire_ok, _ = await async_acquire(limiter, "demo")
+        assert not acquire_ok
+
+    cost = int((time() - start) * 1000)
+    # NOTE: each delay is 250ms plus jitter, a third one would exceed the 600ms budget
+    assert bucket.put_count == 3
+    logger.info("Retries within budget cost: %s", cost)
+    assert 500 <= cost < 700
+
+    limiter.dispose(bucket)
+
+
+@pytest.mark.asyncio
+async def test_limiter_async_waiters():
+    """Concurrent waiters on an async bucket are woken up by the leaker
+    and admitted as soon as the bucket has space again, well before their expected delay
+    """
+    bucket = BucketAsyncWrapper(InMemoryBucket([Rate(2, 500)]))
+    # NOTE: a large latency-tolerance, so that the expected delay is clearly longer than
+    # the time it takes for the leaker to free up space
+    limiter = Limiter(bucket, clock=TimeClock(), max_delay=2000, latency_tolerance=500)
+    limiter.bucket_factory.leak_interval = 50
+
+    assert await limiter.try_acquire("demo")
+    assert await limiter.try_acquire("demo")
+
+    results = await asyncio.gather(*[async_acquire(limiter, "demo") for _ in range(2)])
+    logger.info("Waiters result: %s", results)
+
+    for acquire_ok, cost in results:
+        assert acquire_ok
+        assert 400 < cost < 800
+
+    limiter.dispose(bucket)
+
+
+def test_limiter_async_waiters_multiple_loops():
+    """The same limiter keeps delaying async acquires when used in another event loop"""
+    limiter = None
+
+    async def acquire_many():
+        nonlocal limiter
+
+        if limiter is None:
+            limiter = Limiter(
+                BucketAsyncWrapper(InMemoryBucket([Rate(2, 200)])),
+                clock=TimeClock(),
+                max_delay=Duration.SECOND,
+            )
+
+        return [await limiter.try_acquire("demo") for _ in range(3)]
+
+    assert asyncio.run(acquire_many()) == [True] * 3
+    assert asyncio.run(acquire_many()) == [True] * 3
+
+
+@pytest.mark.asyncio
+async def test_limiter_replaced_bucket():
+    """A bucket replaced by one of another kind (sync/async)
+    must not inherit the dispatch cached for the previous bucket
+    """
+
+    class AsyncPutBucket(InMemoryBucket):
+        async def put(self, item):  # type: ignore
+            return super().put(item)
+
+    factory = DemoBucketFactory(TimeClock(), demo=InMemoryBucket(DEFAULT_RATES))
+    limiter = Limiter(factory)
+    assert limiter.try_acquire("demo") is True
+
+    # NOTE: the new bucket is likely to reuse the memory, hence the id, of the dropped one
+    del factory.buckets["demo"]
+    bucket = AsyncPutBucket(DEFAULT_RATES)
+    factory.buckets["demo"] = bucket
+
+    acquire = limiter.try_acquire("demo")
+    assert isawaitable(acquire)
+    assert await acquire is True
+    assert bucket.count() == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_delay_or_raise_unseen_bucket():
+    """delay_or_raise works with buckets the limiter has not put any item into"""
+    limiter = Limiter(Rate(1, 200), max_delay=Duration.SECOND)
+    now = TimeClock().now()
+
+    bucket = InMemoryBucket([Rate(1, 200)])
+    assert bucket.put(RateItem("demo", now))
+    item = RateItem("demo", now)
+    assert not bucket.put(item)
+    assert limiter.delay_or_raise(bucket, item) is True
+
+    async_bucket = BucketAsyncWrapper(InMemoryBucket([Rate(1, 200)]))
+    assert await async_bucket.put(RateItem("demo", now))
+    item = RateItem("demo", now)
+    assert not await async_bucket.put(item)
+    delay = limiter.delay_or_raise(async_bucket, item)
+    assert isawaitable(delay)
+    assert await delay is True
+
+
+def test_limiter_unhashable_bucket():
+    """Buckets need not be hashable"""
+
+    class UnhashableBucket(InMemoryBucket):
+        def __eq__(self, other):
+            return self is other
+
+    bucket = UnhashableBucket(DEFAULT_RATES)
+    limiter = Limiter(bucket)
+    assert limiter.try_acquire("demo") is True
+    assert bucket.count() == 1
+    assert limiter.dispose(bucket)
+
+
 @pytest.mark.asyncio
 async def test_limiter_decorator(
     clock,
@@ -329,6 +508,9 @@ async def test_limiter_decorator(
         nonlocal counter
         counter += num
 
+    assert not asyncio.iscoroutinefunction(inc_counter)
+    assert asyncio.iscoroutinefunction(async_inc_counter)
+
     inc = inc_counter(1)
 
     if isawaitable(inc):
@@ -338,3 +520,10 @@ async def test_limiter_decorator(
 
     await async_inc_counter(1)
     assert counter == 2
+
+    @limiter_wrapper(lambda _: ("demo", "1"))
+    def invalid_mapping(_: int):
+        pass
+
+    with pytest.raises(TypeError):
+        invalid_mapping(1)